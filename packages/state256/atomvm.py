@@ -9,12 +9,54 @@ Demonstrates the core concepts:
 - Path-based addressing with validation
 """
 
+import itertools
 import sys
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 from dataclasses import dataclass, field
 from enum import Enum
 
 
+# Path domains, in canonical path order
+FRAMES = ("FrameA", "FrameB")
+CONTEXTS = ("Local", "Remote", "Proposed", "Canonical")
+BLOCKS = ("Block1", "Block2")
+RECORDS = ("Record1", "Record2")
+CLOSURES = ("Closure1", "Closure2")
+LOGICS = ("Logic1", "Logic2")
+RELATIONS = ("Relation1", "Relation2")
+ATOMS = ("L", "R")
+
+_DOMAINS = (FRAMES, CONTEXTS, BLOCKS, RECORDS, CLOSURES, LOGICS, RELATIONS, ATOMS)
+
+# Every canonical leaf path, built once at import
+_ALL_COMPONENTS = tuple(itertools.product(*_DOMAINS))
+_ALL_PATHS = tuple("State." + ".".join(t) for t in _ALL_COMPONENTS)
+
+# Leaf slot index for each canonical path (its position in _ALL_PATHS)
+_PATH_TO_IDX: Dict[str, int] = {path: i for i, path in enumerate(_ALL_PATHS)}
+
+_VALID_FRAMES = frozenset(FRAMES)
+_VALID_CONTEXTS = frozenset(CONTEXTS)
+_VALID_BLOCKS = frozenset(BLOCKS)
+_VALID_RECORDS = frozenset(RECORDS)
+_VALID_CLOSURES = frozenset(CLOSURES)
+_VALID_LOGICS = frozenset(LOGICS)
+_VALID_RELATIONS = frozenset(RELATIONS)
+_VALID_ATOMS = frozenset(ATOMS)
+
+
+def is_valid_path(path: str) -> bool:
+    """Check a canonical leaf path without building an AtomPath"""
+    return path in _PATH_TO_IDX
+
+
+def _check_paths(paths: Iterable[str]):
+    """Raise ValueError naming every invalid path in paths"""
+    bad = set(paths) - _PATH_TO_IDX.keys()
+    if bad:
+        raise ValueError(f"Invalid paths: {', '.join(map(str, sorted(bad, key=str)))}")
+
+
 class Dimension(Enum):
     """Dimensional levels in the hierarchy"""
     ATOM1 = 1
@@ -28,8 +70,7 @@ class Dimension(Enum):
     STATE256 = 256   # Register (squarable) - S²⁵⁵ sphere
 
 
-@dataclass
-class AtomPath:
+class AtomPath(NamedTuple):
     """Canonical path to an atom in State256"""
     frame: str       # FrameA, FrameB
     context: str     # Local, Remote, Proposed, Canonical
@@ -42,52 +83,80 @@ class AtomPath:
 
     @classmethod
     def from_string(cls, path_str: str) -> Optional['AtomPath']:
-        """Parse canonical path string"""
-        parts = path_str.split('.')
-        if len(parts) != 9 or parts[0] != "State":
-            return None
-
-        try:
-            return cls(
-                frame=parts[1],
-                context=parts[2],
-                block=parts[3],
-                record=parts[4],
-                closure=parts[5],
-                logic=parts[6],
-                relation=parts[7],
-                atom=parts[8]
-            )
-        except:
-            return None
+        """Parse canonical path string (None if malformed or out of domain)"""
+        return _PARSED_PATHS.get(path_str)
 
     def to_string(self) -> str:
         """Convert to canonical path string"""
-        return f"State.{self.frame}.{self.context}.{self.block}.{self.record}.{self.closure}.{self.logic}.{self.relation}.{self.atom}"
+        return "State." + ".".join(self)
 
     def validate(self) -> bool:
         """Validate path components against domain"""
-        valid_frames = {"FrameA", "FrameB"}
-        valid_contexts = {"Local", "Remote", "Proposed", "Canonical"}
-        valid_blocks = {"Block1", "Block2"}
-        valid_records = {"Record1", "Record2"}
-        valid_closures = {"Closure1", "Closure2"}
-        valid_logics = {"Logic1", "Logic2"}
-        valid_relations = {"Relation1", "Relation2"}
-        valid_atoms = {"L", "R"}
-
         return (
-            self.frame in valid_frames and
-            self.context in valid_contexts and
-            self.block in valid_blocks and
-            self.record in valid_records and
-            self.closure in valid_closures and
-            self.logic in valid_logics and
-            self.relation in valid_relations and
-            self.atom in valid_atoms
+            self.frame in _VALID_FRAMES and
+            self.context in _VALID_CONTEXTS and
+            self.block in _VALID_BLOCKS and
+            self.record in _VALID_RECORDS and
+            self.closure in _VALID_CLOSURES and
+            self.logic in _VALID_LOGICS and
+            self.relation in _VALID_RELATIONS and
+            self.atom in _VALID_ATOMS
         )
 
 
+# The path grammar is finite, so parsing is evaluated ahead of time: each
+# canonical path maps straight to its (immutable, shared) AtomPath and
+# anything else misses
+_PARSED_PATHS: Dict[str, AtomPath] = {
+    path: AtomPath._make(parts) for path, parts in zip(_ALL_PATHS, _ALL_COMPONENTS)
+}
+
+
+class Relation(NamedTuple):
+    """Relation2 pair held structurally (see AtomVM.build_relation)"""
+    left: Union['Relation', str, int, float]
+    right: Union['Relation', str, int, float]
+
+    def to_sexpr(self) -> str:
+        """Materialize as the same string AtomVM.pair/build_tree produce"""
+        return to_sexpr(self)
+
+
+def to_sexpr(node: Union[Relation, str, int, float]) -> str:
+    """Materialize any AtomVM.build_relation result (Relation or bare atom)"""
+    out: List[str] = []
+    _write_sexpr(node, out.append)
+    return "".join(out)
+
+
+def _write_sexpr(node, emit: Callable[[str], None]):
+    if type(node) is Relation:
+        emit("(")
+        _write_sexpr(node.left, emit)
+        emit(" . ")
+        _write_sexpr(node.right, emit)
+        emit(")")
+    else:
+        emit(str(node))
+
+
+def _reduce_pairs(atoms: List, pair: Callable):
+    """Pair atoms level by level until one root remains (atoms non-empty)"""
+    # Each level's pairs are written in place into the front of one buffer
+    buf = list(atoms)
+    n = len(buf)
+
+    while n > 1:
+        half = (n + 1) // 2
+        for i in range(n // 2):
+            buf[i] = pair(buf[2 * i], buf[2 * i + 1])
+        if n & 1:
+            buf[half - 1] = buf[n - 1]  # odd carry
+        n = half
+
+    return buf[0]
+
+
 @dataclass
 class VMState:
     """Virtual machine state with registers and stack"""
@@ -100,8 +169,9 @@ class VMState:
     # Stack for non-squarable dimensions
     stack: List[Union[str, int, float]] = field(default_factory=list)
 
-    # Leaf storage (full State256 tree)
-    leaves: Dict[str, Union[str, int, float]] = field(default_factory=dict)
+    # Leaf storage (full State256 tree), one slot per canonical path in
+    # _ALL_PATHS order; None marks a leaf that has never been stored
+    leaves: List[Optional[Union[str, int, float]]] = field(default_factory=lambda: [None] * len(_ALL_PATHS))
 
     # Program counter
     pc: int = 0
@@ -112,77 +182,92 @@ class AtomVM:
 
     def __init__(self):
         self.state = VMState()
+        # (kind, detail) of the most recent failed call; not cleared on success
+        self.last_error: Optional[Tuple[str, str]] = None
         self._init_domains()
 
     def _init_domains(self):
         """Initialize valid domain values"""
-        self.frames = ["FrameA", "FrameB"]
-        self.contexts = ["Local", "Remote", "Proposed", "Canonical"]
-        self.blocks = ["Block1", "Block2"]
-        self.records = ["Record1", "Record2"]
-        self.closures = ["Closure1", "Closure2"]
-        self.logics = ["Logic1", "Logic2"]
-        self.relations = ["Relation1", "Relation2"]
-        self.atoms = ["L", "R"]
+        self.frames = list(FRAMES)
+        self.contexts = list(CONTEXTS)
+        self.blocks = list(BLOCKS)
+        self.records = list(RECORDS)
+        self.closures = list(CLOSURES)
+        self.logics = list(LOGICS)
+        self.relations = list(RELATIONS)
+        self.atoms = list(ATOMS)
 
     def zero_state(self) -> List[str]:
         """Generate zero State256 (all atoms = Ø)"""
-        paths = []
-        for frame in self.frames:
-            for context in self.contexts:
-                for block in self.blocks:
-                    for record in self.records:
-                        for closure in self.closures:
-                            for logic in self.logics:
-                                for relation in self.relations:
-                                    for atom in self.atoms:
-                                        path = f"State.{frame}.{context}.{block}.{record}.{closure}.{logic}.{relation}.{atom}"
-                                        self.state.leaves[path] = "Ø"
-                                        paths.append(path)
-        return paths
+        self.state.leaves = ["Ø"] * len(_ALL_PATHS)
+        return list(_ALL_PATHS)
 
     def set_leaf(self, path: str, value: Union[str, int, float]) -> bool:
         """Set a leaf value with path validation"""
-        atom_path = AtomPath.from_string(path)
-        if not atom_path or not atom_path.validate():
-            print(f"ERROR: Invalid path: {path}", file=sys.stderr)
+        i = _PATH_TO_IDX.get(path)
+        if i is None:
+            self.last_error = ("invalid_path", path)
             return False
 
-        self.state.leaves[path] = value if value != "" else "Ø"
+        self.state.leaves[i] = value if value != "" else "Ø"
         return True
 
     def get_leaf(self, path: str) -> Optional[Union[str, int, float]]:
         """Get a leaf value"""
-        atom_path = AtomPath.from_string(path)
-        if not atom_path or not atom_path.validate():
-            print(f"ERROR: Invalid path: {path}", file=sys.stderr)
+        i = _PATH_TO_IDX.get(path)
+        if i is None:
+            self.last_error = ("invalid_path", path)
             return None
 
-        return self.state.leaves.get(path, "Ø")
+        value = self.state.leaves[i]
+        return "Ø" if value is None else value
+
+    def iter_leaves(self) -> Iterator[Tuple[str, Union[str, int, float]]]:
+        """Yield (path, value) for every leaf in canonical order, Ø if unset"""
+        for path, value in zip(_ALL_PATHS, self.state.leaves):
+            yield path, "Ø" if value is None else value
+
+    def set_leaves(self, items: Iterable[Tuple[str, Union[str, int, float]]]):
+        """Set many leaf values at once (all paths validated before any write)"""
+        items = dict(items)
+        _check_paths(items.keys())
+
+        leaves = self.state.leaves
+        for path, value in items.items():
+            leaves[_PATH_TO_IDX[path]] = value if value != "" else "Ø"
+
+    def get_leaves(self, paths: Iterable[str]) -> List[Union[str, int, float]]:
+        """Get many leaf values at once, in the order given"""
+        paths = list(paths)
+        _check_paths(paths)
+
+        leaves = self.state.leaves
+        values = [leaves[_PATH_TO_IDX[path]] for path in paths]
+        return ["Ø" if value is None else value for value in values]
 
     def load_to_logic4(self, values: List[Union[str, int, float]]):
         """Load values into Logic4 registers (S³ sphere)"""
-        for i in range(min(4, len(values))):
-            self.state.logic4[i] = values[i]
+        n = len(values)
+        self.state.logic4[:min(n, 4)] = values if n <= 4 else values[:4]
 
     def load_to_record16(self, values: List[Union[str, int, float]]):
         """Load values into Record16 registers (S¹⁵ sphere)"""
-        for i in range(min(16, len(values))):
-            self.state.record16[i] = values[i]
+        n = len(values)
+        self.state.record16[:min(n, 16)] = values if n <= 16 else values[:16]
 
     def load_to_context64(self, batch: int, values: List[Union[str, int, float]]):
         """Load batch into Context64 registers (S⁶³ sphere)"""
         if 0 <= batch < 4:
             start = batch * 16
-            for i in range(min(16, len(values))):
-                self.state.context64[start + i] = values[i]
+            n = len(values)
+            self.state.context64[start:start + min(n, 16)] = values if n <= 16 else values[:16]
 
     def load_to_state256(self, batch: int, values: List[Union[str, int, float]]):
         """Load batch into State256 registers (S²⁵⁵ sphere)"""
         if 0 <= batch < 16:
             start = batch * 16
-            for i in range(min(16, len(values))):
-                self.state.state256[start + i] = values[i]
+            n = len(values)
+            self.state.state256[start:start + min(n, 16)] = values if n <= 16 else values[:16]
 
     def push_stack(self, value: Union[str, int, float]):
         """Push to stack (for non-squarable dimensions)"""
@@ -200,21 +285,18 @@ class AtomVM:
         """Build nested relation tree from flat atoms"""
         if not atoms:
             return "Ø"
+        return _reduce_pairs(atoms, self.pair)
 
-        current = atoms[:]
-        level = 0
-
-        while len(current) > 1:
-            next_level = []
-            for i in range(0, len(current), 2):
-                if i + 1 < len(current):
-                    next_level.append(self.pair(current[i], current[i + 1]))
-                else:
-                    next_level.append(current[i])  # odd carry
-            current = next_level
-            level += 1
+    def build_relation(self, atoms: List[Union[str, int, float]]) -> Union[Relation, str, int, float]:
+        """Build nested relation tree from flat atoms without formatting it
 
-        return current[0] if current else "Ø"
+        Same shape as build_tree, but the pairs are Relation tuples. The
+        result is a bare atom (or Ø) for fewer than two atoms, so use the
+        module-level to_sexpr() when the string form is actually needed.
+        """
+        if not atoms:
+            return "Ø"
+        return _reduce_pairs(atoms, Relation)
 
     def dump_state(self):
         """Dump current VM state"""
@@ -224,7 +306,104 @@ class AtomVM:
         print(f"Context64 (S⁶³) [first 8]: {self.state.context64[:8]}...")
         print(f"State256 (S²⁵⁵) [first 8]: {self.state.state256[:8]}...")
         print(f"\nStack (depth={len(self.state.stack)}): {self.state.stack[-5:] if len(self.state.stack) > 5 else self.state.stack}")
-        print(f"Leaves stored: {len(self.state.leaves)}")
+        stored = len(self.state.leaves) - self.state.leaves.count(None)
+        print(f"Leaves stored: {stored}")
+
+
+def _cmd_exit(vm: AtomVM, parts: List[str]) -> bool:
+    return False
+
+
+def _cmd_zero(vm: AtomVM, parts: List[str]) -> bool:
+    paths = vm.zero_state()
+    print(f"Generated {len(paths)} zero atoms")
+    return True
+
+
+def _cmd_set(vm: AtomVM, parts: List[str]) -> bool:
+    path = parts[1]
+    value = parts[2]
+    if vm.set_leaf(path, value):
+        print(f"OK {path}")
+    else:
+        print(f"ERROR: Invalid path: {path}", file=sys.stderr)
+    return True
+
+
+def _cmd_get(vm: AtomVM, parts: List[str]) -> bool:
+    path = parts[1]
+    value = vm.get_leaf(path)
+    if value is not None:
+        print(f"{path} = {value}")
+    else:
+        print(f"ERROR: Invalid path: {path}", file=sys.stderr)
+    return True
+
+
+def _cmd_load(vm: AtomVM, parts: List[str]) -> bool:
+    # One <path>=<value> pair per line; blank lines and # comments skipped
+    items = []
+    with open(parts[1], encoding="utf-8") as f:
+        for lineno, raw in enumerate(f, 1):
+            entry = raw.strip()
+            if not entry or entry.startswith("#"):
+                continue
+            path, sep, value = entry.partition("=")
+            if not sep:
+                raise ValueError(f"{parts[1]}:{lineno}: expected <path>=<value>")
+            items.append((path.strip(), value.strip()))
+    vm.set_leaves(items)
+    print(f"Loaded {len(items)} leaves")
+    return True
+
+
+def _cmd_dump(vm: AtomVM, parts: List[str]) -> bool:
+    vm.dump_state()
+    return True
+
+
+def _cmd_help(vm: AtomVM, parts: List[str]) -> bool:
+    print("Commands:")
+    print("  zero - Initialize zero State256")
+    print("  set <path> <value> - Set leaf value")
+    print("  get <path> - Get leaf value")
+    print("  load <file> - Set leaf values from <path>=<value> lines")
+    print("  dump - Dump VM state")
+    print("  exit - Exit REPL")
+    return True
+
+
+# REPL command -> (minimum number of line parts, handler)
+_COMMANDS: Dict[str, Tuple[int, Callable[[AtomVM, List[str]], bool]]] = {
+    "exit": (1, _cmd_exit),
+    "quit": (1, _cmd_exit),
+    "zero": (1, _cmd_zero),
+    "set": (3, _cmd_set),
+    "get": (2, _cmd_get),
+    "load": (2, _cmd_load),
+    "dump": (1, _cmd_dump),
+    "help": (1, _cmd_help),
+}
+
+
+def _dispatch(vm: AtomVM, line: str) -> bool:
+    """Run one REPL line; returns False when the REPL should exit"""
+    line = line.strip()
+    if not line:
+        return True
+
+    parts = line.split(None, 2)
+    cmd = parts[0].lower()
+    entry = _COMMANDS.get(cmd)
+    if entry is None or len(parts) < entry[0]:
+        print(f"Unknown command: {cmd}")
+        return True
+
+    try:
+        return entry[1](vm, parts)
+    except Exception as e:
+        print(f"Error: {e}")
+        return True
 
 
 def main():
@@ -284,52 +463,27 @@ def main():
     else:
         # Interactive REPL
         print("AtomVM Interactive REPL")
-        print("Commands: zero, set <path> <value>, get <path>, dump, exit")
+        print("Commands: zero, set <path> <value>, get <path>, load <file>, dump, exit")
         print()
 
-        while True:
-            try:
-                line = input("atomvm> ").strip()
-                if not line:
-                    continue
-
-                parts = line.split(None, 2)
-                cmd = parts[0].lower()
-
-                if cmd == "exit" or cmd == "quit":
+        if sys.stdin.isatty():
+            while True:
+                try:
+                    if not _dispatch(vm, input("atomvm> ")):
+                        break
+                except EOFError:
                     break
-                elif cmd == "zero":
-                    paths = vm.zero_state()
-                    print(f"Generated {len(paths)} zero atoms")
-                elif cmd == "set" and len(parts) >= 3:
-                    path = parts[1]
-                    value = parts[2]
-                    if vm.set_leaf(path, value):
-                        print(f"OK {path}")
-                elif cmd == "get" and len(parts) >= 2:
-                    path = parts[1]
-                    value = vm.get_leaf(path)
-                    if value is not None:
-                        print(f"{path} = {value}")
-                elif cmd == "dump":
-                    vm.dump_state()
-                elif cmd == "help":
-                    print("Commands:")
-                    print("  zero - Initialize zero State256")
-                    print("  set <path> <value> - Set leaf value")
-                    print("  get <path> - Get leaf value")
-                    print("  dump - Dump VM state")
-                    print("  exit - Exit REPL")
-                else:
-                    print(f"Unknown command: {cmd}")
-
-            except EOFError:
-                break
+                except KeyboardInterrupt:
+                    print("\nInterrupted")
+                    break
+        else:
+            # Piped input: read buffered lines, no prompt or line editing
+            try:
+                for line in sys.stdin:
+                    if not _dispatch(vm, line):
+                        break
             except KeyboardInterrupt:
                 print("\nInterrupted")
-                break
-            except Exception as e:
-                print(f"Error: {e}")
 
 
 if __name__ == "__main__":